@@ -1,13 +1,113 @@
 import os
+import re
+import mmap
 import json
-import base64
-import whisper
+import queue
+import socket
+import sqlite3
+import tempfile
+import threading
 import requests
+import numpy as np
+import ctranslate2
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+try:
+    import pybase64 as base64  # SIMD-accelerated, drop-in for the stdlib module
+except ImportError:
+    import base64
+
+try:
+    from orjson import loads as json_loads  # Parses bytes directly, much faster than json
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    from blake3 import blake3 as file_hash  # SIMD-accelerated hashing
+except ImportError:
+    from hashlib import blake2b as file_hash
+
+try:
+    import ahocorasick  # Multi-pattern search in one linear scan
+except ImportError:
+    ahocorasick = None
 
 MODEL = 'llama3.2-vision:latest'
+# Whisper checkpoint; "tiny" is faster than "base" at some cost in accuracy,
+# ".en" variants are English only
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+# Language of the voice notes (e.g. "en"); detected per note when unset
+WHISPER_LANGUAGE = os.environ.get("WHISPER_LANGUAGE") or None
+OLLAMA_URL = "http://localhost:11434/api/generate"
+WHISPER_BATCH_SIZE = 16  # VAD segments decoded together per forward pass
+SAMPLE_RATE = 16000  # Whisper expects 16 kHz mono audio
+AUDIO_DECODE_AHEAD = 4  # Decoded voice notes buffered ahead of transcription
+# Short voice notes are concatenated into clips that fit one Whisper window;
+# only done when the language is known, since Whisper detects one per clip
+PACK_NOTE_MAX_SECONDS = 10  # Longer notes are transcribed on their own
+PACK_MAX_SECONDS = 30  # Whisper's input window
+PACK_SEPARATOR_SECONDS = 0.5  # Silence inserted between packed notes
+OLLAMA_MAX_WORKERS = 8  # Concurrent image description requests
+CACHE_FILE = ".mediacache.db"  # Per-folder cache of transcriptions and descriptions
+CHAT_FILES = {"_chat.txt", "processed_chat.txt"}  # Not media, skipped when scanning
+WHISPER_WORKER_CONNECT_TIMEOUT = 5  # Seconds to connect to the Whisper worker and handshake
+WHISPER_WORKER_TIMEOUT = 600  # Seconds to wait for one transcription from the worker
+# 1x1 white PNG used to load the vision model before real images arrive
+WARMUP_IMAGE_BASE64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC"
+
+def _default_worker_socket() -> str:
+    """
+    Pick a per-user location for the Whisper worker socket.
+    
+    Returns:
+        Socket path inside $XDG_RUNTIME_DIR, or a per-user directory in the temp directory
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+        runtime_dir = os.path.join(tempfile.gettempdir(), f"whisper_worker-{user}")
+    return os.path.join(runtime_dir, "whisper_worker.sock")
+
+# Unix socket of the optional long-running Whisper worker (whisper_worker.py)
+WHISPER_WORKER_SOCKET = os.environ.get("WHISPER_WORKER_SOCKET", _default_worker_socket())
+
+def select_whisper_device() -> Tuple[str, str]:
+    """
+    Pick the device and compute type for the Whisper model.
+    
+    Returns:
+        Tuple of (device, compute_type)
+    """
+    if ctranslate2.get_cuda_device_count() > 0:
+        # Use FP16 tensor cores where the GPU supports them
+        supported = ctranslate2.get_supported_compute_types("cuda")
+        if "float16" in supported:
+            return "cuda", "float16"
+        return "cuda", "int8_float32" if "int8_float32" in supported else "float32"
+    return "cpu", "int8"
+
+def transcribe_audio(batched_model: BatchedInferencePipeline, audio: Union[str, np.ndarray]) -> str:
+    """
+    Transcribe audio with the batched Whisper pipeline.
+    
+    Args:
+        batched_model: Pipeline wrapping the loaded Whisper model
+        audio: Path to an audio file or 16 kHz mono float32 samples
+        
+    Returns:
+        Transcribed text
+    """
+    # Decode VAD segments in batches (segments are produced lazily as they are decoded)
+    segments, _ = batched_model.transcribe(
+        audio, batch_size=WHISPER_BATCH_SIZE, beam_size=1, vad_filter=True, language=WHISPER_LANGUAGE
+    )
+    
+    # Return only the transcribed text, cleaned
+    return " ".join(segment.text.strip() for segment in segments).strip()
 
 class WhatsAppChatProcessor:
     def __init__(self, folder_path: str):
@@ -20,10 +120,18 @@ class WhatsAppChatProcessor:
         """
         self.folder_path = Path(folder_path)
         self.ollama_model = MODEL
+        self.ollama_url = OLLAMA_URL
         self.chat_content = ""
+        self._replacements: Dict[str, str] = {}  # Media reference -> replacement text
         self.whisper_model = None  # Lazy loading for faster initialization
+        self.batched_model = None
+        self.whisper_worker = None  # Connection to whisper_worker.py, if one is running
+        self._worker_stream = None
+        self.whisper_model_name = WHISPER_MODEL  # Model behind the transcriptions, worker's if connected
         self.logger = self._setup_logger()
-        self._check_ffmpeg()
+        self.session = self._setup_session()
+        self._cache_lock = threading.Lock()  # Image workers share the connection
+        self.cache = self._setup_cache()
         
     def _setup_logger(self) -> logging.Logger:
         """Configure logging for the processor."""
@@ -33,35 +141,271 @@ class WhatsAppChatProcessor:
         )
         return logging.getLogger(__name__)
 
-    def _check_ffmpeg(self) -> None:
-        """Check if FFmpeg is properly installed and accessible."""
+    def _setup_session(self) -> requests.Session:
+        """Create a keep-alive HTTP session for Ollama requests."""
+        session = requests.Session()
+        # One pooled connection per concurrent image worker
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=OLLAMA_MAX_WORKERS,
+            pool_maxsize=OLLAMA_MAX_WORKERS
+        )
+        session.mount("http://", adapter)
+        return session
+
+    def _setup_cache(self) -> Optional[sqlite3.Connection]:
+        """
+        Open the media result cache stored in the chat folder.
+        
+        Returns:
+            SQLite connection, or None if the cache is unavailable
+        """
+        try:
+            cache = sqlite3.connect(str(self.folder_path / CACHE_FILE), check_same_thread=False)
+            cache.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, text TEXT)")
+            cache.commit()
+            return cache
+        except sqlite3.Error as e:
+            self.logger.warning(f"Media cache disabled: {str(e)}")
+            return None
+
+    def _file_digest(self, file_path: Path) -> str:
+        """
+        Hash the contents of a media file for use in cache keys.
+        
+        Args:
+            file_path: Path to the media file
+            
+        Returns:
+            Hex digest of the file contents
+        """
+        digest = file_hash()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _media_digests(self, file_paths: List[Path]) -> Dict[Path, Optional[str]]:
+        """
+        Hash each media file once so the digest can be reused for the whole run.
+        
+        Args:
+            file_paths: Paths to the media files
+            
+        Returns:
+            Mapping of path to digest, or None if the file could not be read
+        """
+        digests = {}
+        for file_path in file_paths:
+            try:
+                digests[file_path] = self._file_digest(file_path)
+            except OSError as e:
+                self.logger.warning(f"Error hashing media file {file_path}: {str(e)}")
+                digests[file_path] = None
+        return digests
+
+    def _audio_cache_key(self, digest: str, model_name: Optional[str] = None) -> str:
+        """Build the cache key for a voice note transcription, by default for the current model."""
+        return f"whisper-{model_name or self.whisper_model_name}:{digest}"
+
+    def _image_cache_key(self, digest: str) -> str:
+        """Build the cache key for an image description."""
+        return f"{self.ollama_model}:{digest}"
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Return the cached result for key, if any."""
+        if self.cache is None:
+            return None
         try:
-            import subprocess
-            subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-        except (subprocess.SubprocessError, FileNotFoundError):
-            self.logger.error("FFmpeg is not installed or not found in PATH")
-            print("\nFFmpeg is required but not found. Please install FFmpeg:")
-            print("- Windows: Download from https://ffmpeg.org/download.html")
-            print("- Mac: Run 'brew install ffmpeg'")
-            print("- Linux: Run 'sudo apt-get install ffmpeg'")
-            raise RuntimeError("FFmpeg not found")
-
-    def _load_whisper_model(self) -> None:
-        """Lazy load the Whisper model when needed."""
-        if self.whisper_model is None:
+            with self._cache_lock:
+                row = self.cache.execute("SELECT text FROM results WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error reading media cache: {str(e)}")
+            return None
+        return row[0] if row else None
+
+    def _cache_put(self, key: str, text: str) -> None:
+        """Store a result in the cache."""
+        if self.cache is None:
+            return
+        try:
+            with self._cache_lock:
+                self.cache.execute("INSERT OR REPLACE INTO results (key, text) VALUES (?, ?)", (key, text))
+                self.cache.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Error writing media cache: {str(e)}")
+
+    def _connect_whisper_worker(self) -> bool:
+        """
+        Connect to a running Whisper worker, which keeps the model loaded across runs.
+        
+        Returns:
+            Boolean indicating whether a worker is available
+        """
+        if not hasattr(socket, "AF_UNIX") or not hasattr(os, "getuid"):
+            return False
+        # Only trust a socket owned by the current user; anyone else could
+        # answer with fabricated transcriptions that would then be cached
+        try:
+            if os.stat(WHISPER_WORKER_SOCKET).st_uid != os.getuid():
+                self.logger.warning(f"Ignoring Whisper worker socket not owned by this user: {WHISPER_WORKER_SOCKET}")
+                return False
+        except OSError:
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(WHISPER_WORKER_CONNECT_TIMEOUT)
+        try:
+            sock.connect(WHISPER_WORKER_SOCKET)
+        except OSError:
+            sock.close()
+            return False
+        self.whisper_worker = sock
+        self._worker_stream = sock.makefile('rwb')
+        try:
+            # The worker may run a different model; results are cached under its name
+            reply = self._worker_request({"command": "info"})
+            model_name = reply['model']
+        except (OSError, ValueError, KeyError, RuntimeError) as e:
+            self.logger.warning(f"Whisper worker handshake failed: {str(e)}")
+            self._close_whisper_worker()
+            return False
+        # A busy worker may take a while to get to a request, but never forever
+        sock.settimeout(WHISPER_WORKER_TIMEOUT)
+        self.whisper_model_name = model_name
+        self.logger.info(f"Using Whisper worker at {WHISPER_WORKER_SOCKET} (model {self.whisper_model_name})")
+        return True
+
+    def _close_whisper_worker(self) -> None:
+        """Drop the connection to the Whisper worker."""
+        if self.whisper_worker is not None:
+            try:
+                self._worker_stream.close()
+                self.whisper_worker.close()
+            except OSError:
+                pass
+            self.whisper_worker = None
+            self._worker_stream = None
+            self.whisper_model_name = WHISPER_MODEL
+
+    def _worker_request(self, request: dict) -> dict:
+        """
+        Send one request to the Whisper worker and read its reply.
+        
+        Args:
+            request: JSON-serialisable request
+            
+        Returns:
+            Decoded reply
+        """
+        self._worker_stream.write(json.dumps(request).encode('utf-8') + b"\n")
+        self._worker_stream.flush()
+        line = self._worker_stream.readline()
+        if not line:
+            raise ConnectionError("Whisper worker closed the connection")
+        reply = json_loads(line)
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    def _transcribe_with_worker(self, audio_path: Path) -> Tuple[str, str]:
+        """
+        Transcribe an audio file through the Whisper worker.
+        
+        Args:
+            audio_path: Absolute path to the audio file
+            
+        Returns:
+            Tuple of (transcribed text, name of the model the worker used)
+        """
+        reply = self._worker_request({"command": "transcribe", "path": str(audio_path)})
+        return reply['text'], reply['model']
+
+    def _load_whisper_model(self, use_worker: bool = True) -> None:
+        """
+        Lazy load the Whisper model when needed.
+        
+        Args:
+            use_worker: Use a running Whisper worker instead of loading the model, if available
+        """
+        if self.whisper_model is None and self.whisper_worker is None:
+            if use_worker and self._connect_whisper_worker():
+                return
             self.logger.info("Loading Whisper model...")
             try:
-                self.whisper_model = whisper.load_model("base")
+                # CTranslate2 backend with quantized weights: FP16 on GPU, INT8 on CPU
+                device, compute_type = select_whisper_device()
+                self.logger.info(f"Using {device} with {compute_type} weights for Whisper")
+                self.whisper_model = WhisperModel(WHISPER_MODEL, device=device, compute_type=compute_type)
+                self.batched_model = BatchedInferencePipeline(model=self.whisper_model)
             except Exception as e:
                 self.logger.error(f"Error loading Whisper model: {str(e)}")
                 raise RuntimeError(f"Failed to load Whisper model: {str(e)}")
 
-    def process_audio(self, audio_path: Path) -> str:
+    def warmup(self, audio: bool = True, images: bool = True) -> None:
+        """
+        Run a dummy inference through Whisper and the Ollama vision model.
+        
+        This moves the first-inference stall (model load, kernel selection,
+        vision tower load) ahead of the first media file.
+        Failures are logged and otherwise ignored.
+        
+        Args:
+            audio: Whether to warm up Whisper
+            images: Whether to warm up the Ollama vision model
+        """
+        if audio:
+            self._warmup_whisper()
+        if images:
+            self._warmup_ollama()
+
+    def _warmup_whisper(self) -> None:
+        """Load Whisper and transcribe a short silence."""
+        try:
+            self.logger.info("Warming up Whisper model...")
+            self._load_whisper_model()
+            if self.whisper_worker is not None:
+                return  # The worker is already warm
+            # One second of silence; VAD is disabled so the encoder actually runs
+            segments, _ = self.whisper_model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), vad_filter=False)
+            list(segments)
+        except Exception as e:
+            self.logger.warning(f"Whisper warmup failed: {str(e)}")
+
+    def _warmup_ollama(self) -> None:
+        """Load the Ollama vision model with a tiny image."""
+        try:
+            self.logger.info("Warming up Ollama vision model...")
+            # Generating a single token is enough to load the model
+            self._describe_image(WARMUP_IMAGE_BASE64, max_tokens=1)
+        except Exception as e:
+            self.logger.warning(f"Ollama warmup failed: {str(e)}")
+
+    def _decode_audio(self, audio_path: Path) -> Optional[np.ndarray]:
+        """
+        Decode an audio file to 16 kHz mono float32 in memory.
+        
+        A file that fails is left to Whisper itself, which reports the error.
+        
+        Args:
+            audio_path: Path to the audio file
+            
+        Returns:
+            Decoded samples, or None if the file could not be decoded
+        """
+        try:
+            return decode_audio(str(audio_path), sampling_rate=SAMPLE_RATE)
+        except Exception as e:
+            self.logger.warning(f"Could not decode {audio_path}: {str(e)}")
+            return None
+
+    def process_audio(self, audio_path: Path, audio: Optional[np.ndarray] = None,
+                      digest: Optional[str] = None) -> str:
         """
         Transcribe audio file using Whisper.
         
         Args:
             audio_path: Path to the audio file
+            audio: Samples already decoded by _decode_audio, if available
+            digest: Content digest from _media_digests, if already computed
             
         Returns:
             Transcribed text
@@ -76,17 +420,39 @@ class WhatsAppChatProcessor:
             # Convert path to absolute path
             audio_path = audio_path.absolute()
             
-            # Load model (this will also verify FFmpeg installation)
+            # Reuse the transcription from a previous run if the file is unchanged
+            digest = digest or self._file_digest(audio_path)
+            cache_key = self._audio_cache_key(digest)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self.logger.info(f"Using cached transcription for: {audio_path}")
+                return cached
+            
+            # Load model
             self._load_whisper_model()
             
             # Log the exact path being used
             self.logger.info(f"Transcribing audio from path: {audio_path}")
             
-            # Perform transcription
-            result = self.whisper_model.transcribe(str(audio_path))
+            transcription = None
+            if self.whisper_worker is not None:
+                try:
+                    transcription, model_name = self._transcribe_with_worker(audio_path)
+                    # Cache under the model that actually produced the text
+                    cache_key = self._audio_cache_key(digest, model_name)
+                except OSError as e:
+                    # Worker went away; continue with an in-process model
+                    self.logger.warning(f"Whisper worker failed, loading model locally: {str(e)}")
+                    self._close_whisper_worker()
+                    self._load_whisper_model(use_worker=False)
             
-            # Return only the transcribed text, cleaned
-            return result["text"].strip()
+            # Perform transcription
+            if transcription is None:
+                transcription = transcribe_audio(
+                    self.batched_model, audio if audio is not None else str(audio_path)
+                )
+            self._cache_put(cache_key, transcription)
+            return transcription
             
         except FileNotFoundError as e:
             self.logger.error(f"Audio file not found: {audio_path}")
@@ -95,12 +461,13 @@ class WhatsAppChatProcessor:
             self.logger.error(f"Error processing audio file {audio_path}: {str(e)}")
             return f"[Error transcribing audio: {str(e)}]"
 
-    def process_image(self, image_path: Path) -> str:
+    def process_image(self, image_path: Path, digest: Optional[str] = None) -> str:
         """
         Process image using Ollama model.
         
         Args:
             image_path: Path to the image file
+            digest: Content digest from _media_digests, if already computed
             
         Returns:
             Image description
@@ -108,39 +475,80 @@ class WhatsAppChatProcessor:
         try:
             self.logger.info(f"Processing image file: {image_path}")
             
+            # Reuse the description from a previous run if the file is unchanged
+            cache_key = self._image_cache_key(digest or self._file_digest(image_path))
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self.logger.info(f"Using cached description for: {image_path}")
+                return cached
+            
             with open(image_path, 'rb') as img_file:
-                # Convert image to base64
-                image_base64 = base64.b64encode(img_file.read()).decode('utf-8')
+                # Convert image to base64, encoding straight from a memory map
+                # so the file is not copied into a bytes object first
+                try:
+                    with mmap.mmap(img_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        image_base64 = base64.b64encode(mapped).decode('ascii')
+                except ValueError:
+                    # Empty files cannot be mapped
+                    image_base64 = base64.b64encode(img_file.read()).decode('ascii')
                 
-                # Prepare the request
-                url = "http://localhost:11434/api/generate"
-                payload = {
-                    "model": self.ollama_model,
-                    "prompt": "Describe this image in detail but concisely",
-                    "images": [image_base64]
-                }
-                
-                # Make the request
-                response = requests.post(url, json=payload)
-                response.raise_for_status()
-                
-                # Parse the streaming response
-                description = ""
-                for line in response.text.strip().split('\n'):
-                    if line:
-                        try:
-                            response_data = json.loads(line)
-                            if 'response' in response_data:
-                                description += response_data['response']
-                        except json.JSONDecodeError:
-                            continue
-                
-                return description.strip()
+            description = self._describe_image(image_base64)
+            self._cache_put(cache_key, description)
+            return description
                 
         except Exception as e:
             self.logger.error(f"Error processing image file {image_path}: {str(e)}")
             return f"[Error processing image: {str(e)}]"
 
+    def _describe_image(self, image_base64: str, max_tokens: Optional[int] = None) -> str:
+        """
+        Request a description of a base64-encoded image from Ollama.
+        
+        Args:
+            image_base64: Base64-encoded image data
+            max_tokens: Stop generating after this many tokens, if set
+            
+        Returns:
+            Image description
+        """
+        # Prepare the request
+        payload = {
+            "model": self.ollama_model,
+            "prompt": "Describe this image in detail but concisely",
+            "images": [image_base64],
+            "stream": True
+        }
+        if max_tokens is not None:
+            payload["options"] = {"num_predict": max_tokens}
+
+        # Make the request and consume the NDJSON stream as it arrives. The
+        # body is read to the end (the 'done' message is the last line) so the
+        # connection goes back to the session's pool instead of being closed.
+        parts = []
+        done = False
+        with self.session.post(self.ollama_url, json=payload, stream=True) as response:
+            response.raise_for_status()
+            # Lines are left as bytes; both parsers accept them without decoding
+            for line in response.iter_lines(decode_unicode=False):
+                if not line:
+                    continue
+                try:
+                    response_data = json_loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # Ollama reports failures mid-stream with a 200 status; raise so
+                # a partial description is never returned (and cached)
+                if 'error' in response_data:
+                    raise RuntimeError(f"Ollama error: {response_data['error']}")
+                if 'response' in response_data:
+                    parts.append(response_data['response'])
+                if response_data.get('done'):
+                    done = True
+
+        if not done:
+            raise RuntimeError("Ollama stream ended before the description was complete")
+        return "".join(parts).strip()
+
     def read_chat_file(self) -> bool:
         """
         Read the _chat.txt file into memory.
@@ -160,7 +568,9 @@ class WhatsAppChatProcessor:
 
     def replace_media_references(self, filename: str, media_type: str, content: str) -> None:
         """
-        Replace media references in the chat content.
+        Queue a media reference replacement for the chat content.
+        
+        Replacements are applied in a single pass by _apply_replacements.
         
         Args:
             filename: Original filename to replace
@@ -170,10 +580,52 @@ class WhatsAppChatProcessor:
         try:
             original_pattern = f"<attached: {filename}>" # This is for WhatsApp chats exported from iOS, for Samsung use this: f"{filename} (file attached)"
             replacement = f"[{media_type}: {content}]"
-            self.chat_content = self.chat_content.replace(original_pattern, replacement)
+            self._replacements[original_pattern] = replacement
         except Exception as e:
             self.logger.error(f"Error replacing media reference: {str(e)}")
 
+    def _apply_replacements(self) -> None:
+        """Apply all queued media replacements to the chat content in one pass."""
+        if not self._replacements:
+            return
+        if ahocorasick is not None:
+            self.chat_content = self._replace_with_automaton(self.chat_content)
+        else:
+            pattern = re.compile("|".join(re.escape(key) for key in self._replacements))
+            self.chat_content = pattern.sub(lambda m: self._replacements[m.group(0)], self.chat_content)
+        self._replacements.clear()
+
+    def _replace_with_automaton(self, text: str) -> str:
+        """
+        Apply the queued replacements using an Aho-Corasick automaton.
+        
+        The scan is linear in the text length regardless of how many media
+        references there are. Matches are taken left to right, skipping any
+        that overlap one already replaced.
+        
+        Args:
+            text: Chat content to rewrite
+            
+        Returns:
+            Rewritten chat content
+        """
+        automaton = ahocorasick.Automaton()
+        for key, replacement in self._replacements.items():
+            automaton.add_word(key, (len(key), replacement))
+        automaton.make_automaton()
+
+        parts = []
+        position = 0
+        for end, (length, replacement) in automaton.iter(text):
+            start = end - length + 1
+            if start < position:
+                continue
+            parts.append(text[position:start])
+            parts.append(replacement)
+            position = end + 1
+        parts.append(text[position:])
+        return "".join(parts)
+
     def save_processed_chat(self) -> bool:
         """
         Save the processed chat content to a new file.
@@ -184,13 +636,190 @@ class WhatsAppChatProcessor:
         output_file = self.folder_path / "processed_chat.txt"
         try:
             self.logger.info("Saving processed chat")
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(self.chat_content)
+            # Encode once and write the bytes directly, skipping the text layer;
+            # newlines are translated the same way text mode would
+            content = self.chat_content
+            if os.linesep != "\n":
+                content = content.replace("\n", os.linesep)
+            data = memoryview(content.encode('utf-8'))
+            flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+            fd = os.open(str(output_file), flags, 0o644)
+            try:
+                while data:
+                    written = os.write(fd, data)
+                    data = data[written:]
+            finally:
+                os.close(fd)
             return True
         except Exception as e:
             self.logger.error(f"Error saving processed chat: {str(e)}")
             return False
 
+    def _decode_audio_files(self, audio_paths: List[Path], pending: Set[Path],
+                            decoded_notes: queue.Queue) -> None:
+        """
+        Decode voice notes one by one and hand them to the transcription loop.
+        
+        Runs on a background thread so the next notes are decoded while the
+        current one is being transcribed. A None entry marks the end.
+        
+        Args:
+            audio_paths: Paths to the audio files
+            pending: Paths without a cached transcription
+            decoded_notes: Queue receiving (path, decoded samples or None) pairs
+        """
+        for file_path in audio_paths:
+            audio = None
+            # A Whisper worker decodes files itself from their paths, and
+            # voice notes with a cached transcription need no decoding
+            if self.whisper_worker is None and file_path in pending:
+                audio = self._decode_audio(file_path)
+            decoded_notes.put((file_path, audio))
+        decoded_notes.put(None)
+
+    def _process_audio_files(self, audio_paths: List[Path], digests: Dict[Path, Optional[str]],
+                             pending: Set[Path]) -> None:
+        """
+        Transcribe voice notes and queue their chat replacements.
+        
+        Short notes are collected until they fill one Whisper window and then
+        transcribed together, so at most one pack's worth of audio is held
+        besides the few notes decoded ahead.
+        
+        Args:
+            audio_paths: Paths to the audio files
+            digests: Content digests from _media_digests
+            pending: Paths without a cached transcription
+        """
+        decoded_notes = queue.Queue(maxsize=AUDIO_DECODE_AHEAD)
+        decoder = threading.Thread(
+            target=self._decode_audio_files, args=(audio_paths, pending, decoded_notes), daemon=True
+        )
+        decoder.start()
+
+        language = self._pack_language()
+        max_note = PACK_NOTE_MAX_SECONDS * SAMPLE_RATE
+        max_pack = PACK_MAX_SECONDS * SAMPLE_RATE
+        separator = int(PACK_SEPARATOR_SECONDS * SAMPLE_RATE)
+        pack = []  # (path, samples) of short notes waiting to share a Whisper pass
+        length = 0
+        while True:
+            item = decoded_notes.get()
+            if item is None:
+                break
+            file_path, audio = item
+
+            if language and audio is not None and len(audio) <= max_note:
+                added = len(audio) + (separator if pack else 0)
+                if pack and length + added > max_pack:
+                    self._process_pack(pack, digests, language)
+                    pack, length, added = [], 0, len(audio)
+                pack.append((file_path, audio))
+                length += added
+                continue
+
+            self.logger.info(f"Found audio file: {file_path.name}")
+            transcription = self.process_audio(file_path, audio, digests[file_path])
+            self.replace_media_references(file_path.name, "VOICE NOTE", transcription)
+        self._process_pack(pack, digests, language)
+        decoder.join()
+
+    def _process_pack(self, pack: List[Tuple[Path, np.ndarray]], digests: Dict[Path, Optional[str]],
+                      language: Optional[str]) -> None:
+        """
+        Transcribe a pack of short voice notes and queue their chat replacements.
+        
+        Notes the packed pass could not transcribe are done one by one.
+        
+        Args:
+            pack: (path, samples) pairs whose total length fits one Whisper window
+            digests: Content digests from _media_digests
+            language: Language of all the notes
+        """
+        transcriptions = self._transcribe_packed(pack, language) if len(pack) > 1 else {}
+        for file_path, audio in pack:
+            self.logger.info(f"Found audio file: {file_path.name}")
+            transcription = transcriptions.get(file_path)
+            if transcription is not None:
+                if digests[file_path] is not None:
+                    self._cache_put(self._audio_cache_key(digests[file_path]), transcription)
+            else:
+                transcription = self.process_audio(file_path, audio, digests[file_path])
+            self.replace_media_references(file_path.name, "VOICE NOTE", transcription)
+
+    def _pack_language(self) -> Optional[str]:
+        """
+        Return the language shared by all voice notes, if known.
+        
+        Whisper detects a single language per clip, so notes are only packed
+        together when their language is configured or implied by an
+        English-only model.
+        
+        Returns:
+            Language code, or None if notes may be in different languages
+        """
+        if WHISPER_LANGUAGE:
+            return WHISPER_LANGUAGE
+        if self.whisper_model_name.endswith(".en"):
+            return "en"
+        return None
+
+    def _transcribe_packed(self, notes: List[Tuple[Path, np.ndarray]], language: str) -> Dict[Path, str]:
+        """
+        Transcribe several short voice notes as one clip and split the text back per note.
+        
+        The notes are joined with short silences and transcribed with VAD and
+        word timestamps, the same pipeline used for single notes; each word
+        goes to the note whose time range it falls in.
+        
+        Args:
+            notes: (path, samples) pairs whose total length fits one Whisper window
+            language: Language of all the notes
+            
+        Returns:
+            Mapping of path to transcribed text, or an empty dict on failure or
+            when a note gets no words, so the notes are transcribed one by one instead
+        """
+        separator = np.zeros(int(PACK_SEPARATOR_SECONDS * SAMPLE_RATE), dtype=np.float32)
+        pieces = []
+        boundaries = []  # (path, time where the next note's range begins)
+        offset = 0
+        for file_path, audio in notes:
+            if pieces:
+                pieces.append(separator)
+                offset += len(separator)
+            pieces.append(audio)
+            offset += len(audio)
+            boundaries.append((file_path, offset / SAMPLE_RATE + PACK_SEPARATOR_SECONDS / 2))
+
+        try:
+            self._load_whisper_model(use_worker=False)
+            self.logger.info(f"Transcribing {len(notes)} short voice notes as one clip")
+            segments, _ = self.batched_model.transcribe(
+                np.concatenate(pieces), batch_size=WHISPER_BATCH_SIZE, beam_size=1,
+                vad_filter=True, word_timestamps=True, language=language
+            )
+
+            words = {file_path: [] for file_path, _ in notes}
+            for segment in segments:
+                for word in segment.words or []:
+                    middle = (word.start + word.end) / 2
+                    for file_path, boundary in boundaries:
+                        if middle < boundary:
+                            break
+                    words[file_path].append(word.word)
+
+            # A note without words may be silence or may have lost its words to
+            # a neighbour; either way the split is not trustworthy enough to cache
+            empty = [file_path.name for file_path, parts in words.items() if not "".join(parts).strip()]
+            if empty:
+                self.logger.info(f"No words attributed to {', '.join(empty)}; transcribing the pack one by one")
+                return {}
+            return {file_path: "".join(parts).strip() for file_path, parts in words.items()}
+        except Exception as e:
+            self.logger.warning(f"Error transcribing packed voice notes, falling back to one by one: {str(e)}")
+            return {}
+
     def process_folder(self) -> bool:
         """
         Process all media files in the folder and update the chat content.
@@ -203,22 +832,64 @@ class WhatsAppChatProcessor:
             if not self.read_chat_file():
                 return False
 
-            # Process all files in the folder
-            for file_path in self.folder_path.iterdir():
-                if file_path.name == "_chat.txt" or file_path.name == "processed_chat.txt":
-                    continue
+            # Collect media files first so each kind can be processed as a group
+            # (scandir gives the file type without a stat; Paths are only built for media)
+            audio_paths = []
+            image_paths = []
+            media_paths = {'.opus': audio_paths, '.jpg': image_paths}
+            with os.scandir(self.folder_path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name in CHAT_FILES or not entry.is_file(follow_symlinks=False):
+                        continue
 
-                if file_path.suffix.lower() == '.opus':
-                    self.logger.info(f"Found audio file: {file_path.name}")
-                    transcription = self.process_audio(file_path)
-                    self.replace_media_references(file_path.name, "VOICE NOTE", transcription)
-                
-                elif file_path.suffix.lower() == '.jpg':
-                    self.logger.info(f"Found image file: {file_path.name}")
-                    description = self.process_image(file_path)
+                    paths = media_paths.get(os.path.splitext(name)[1].lower())
+                    if paths is not None:
+                        paths.append(Path(entry.path))
+
+            # Hash every file once and look up the cache, so only files that
+            # still need a model count towards loading it. A running Whisper
+            # worker is connected first, since its model decides the cache keys.
+            if audio_paths and self.whisper_model is None and self.whisper_worker is None:
+                self._connect_whisper_worker()
+            digests = self._media_digests(audio_paths + image_paths)
+            pending_audio = {
+                p for p in audio_paths
+                if digests[p] is None or self._cache_get(self._audio_cache_key(digests[p])) is None
+            }
+            pending_images = {
+                p for p in image_paths
+                if digests[p] is None or self._cache_get(self._image_cache_key(digests[p])) is None
+            }
+
+            # Only touch the models this chat actually needs; a chat without
+            # images (or with all of them cached) never loads the Ollama vision
+            # model, and vice versa
+            self.logger.info(
+                f"Found {len(audio_paths)} audio and {len(image_paths)} image files, "
+                f"{len(pending_audio)} and {len(pending_images)} not cached "
+                f"(transcription {'enabled' if pending_audio else 'skipped'}, "
+                f"image description {'enabled' if pending_images else 'skipped'})"
+            )
+
+            # Caption images concurrently so Ollama can batch the requests, and
+            # let that run alongside voice note transcription; chat content is
+            # only updated from this thread
+            for file_path in image_paths:
+                self.logger.info(f"Found image file: {file_path.name}")
+            with ThreadPoolExecutor(max_workers=OLLAMA_MAX_WORKERS) as executor:
+                descriptions = executor.map(
+                    self.process_image, image_paths, [digests[p] for p in image_paths]
+                )
+                # The first image requests load the vision model, so only
+                # Whisper is warmed up here, while those are under way
+                self.warmup(audio=bool(pending_audio), images=False)
+                self._process_audio_files(audio_paths, digests, pending_audio)
+                for file_path, description in zip(image_paths, descriptions):
                     self.replace_media_references(file_path.name, "IMAGE", description)
 
-            # Save the processed chat
+            # Rewrite the chat once with every media reference, then save it
+            self._apply_replacements()
             return self.save_processed_chat()
 
         except Exception as e:
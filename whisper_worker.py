@@ -0,0 +1,110 @@
+import os
+import json
+import logging
+import threading
+import socketserver
+import numpy as np
+from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+from main import SAMPLE_RATE, WHISPER_MODEL, WHISPER_WORKER_SOCKET, select_whisper_device, transcribe_audio
+
+class TranscriptionHandler(socketserver.StreamRequestHandler):
+    """Serve newline-delimited JSON transcription requests on one connection."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                # Every reply names the model, so clients cache results under it
+                if request.get("command") == "info":
+                    reply = {"model": WHISPER_MODEL}
+                else:
+                    reply = {"text": self.server.transcribe(request["path"]), "model": WHISPER_MODEL}
+            except Exception as e:
+                self.server.logger.error(f"Error transcribing request: {str(e)}")
+                reply = {"error": str(e)}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+class WhisperWorker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Each client gets its own thread, so a second run is queued behind the
+    # model lock instead of waiting unanswered in the listen backlog
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        """
+        Load the Whisper model once and listen for transcription requests.
+
+        Args:
+            socket_path: Path of the Unix socket to listen on
+        """
+        self.logger = logging.getLogger(__name__)
+        device, compute_type = select_whisper_device()
+        self.logger.info(f"Loading Whisper model {WHISPER_MODEL} on {device} with {compute_type} weights...")
+        self.whisper_model = WhisperModel(WHISPER_MODEL, device=device, compute_type=compute_type)
+        self.batched_model = BatchedInferencePipeline(model=self.whisper_model)
+        self._model_lock = threading.Lock()
+
+        # Run one second of silence so the first real request is not slowed down
+        segments, _ = self.whisper_model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), vad_filter=False)
+        list(segments)
+
+        # Create the socket readable and writable by this user only
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, TranscriptionHandler)
+        finally:
+            os.umask(old_umask)
+
+    def transcribe(self, audio_path: str) -> str:
+        """
+        Transcribe an audio file with the resident model.
+
+        Args:
+            audio_path: Absolute path to the audio file
+
+        Returns:
+            Transcribed text
+        """
+        self.logger.info(f"Transcribing audio from path: {audio_path}")
+        with self._model_lock:
+            return transcribe_audio(self.batched_model, audio_path)
+
+def main():
+    """
+    Run the worker until interrupted.
+
+    While it is running, WhatsAppChatProcessor sends voice notes to it instead
+    of loading its own copy of the model, and caches the results under the
+    worker's WHISPER_MODEL. Both processes read WHISPER_WORKER_SOCKET from the
+    environment, so they should be started with the same value.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    socket_dir = os.path.dirname(WHISPER_WORKER_SOCKET)
+    if socket_dir:
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+
+    # Remove a socket file left behind by a previous worker, but never one
+    # that belongs to someone else
+    if os.path.lexists(WHISPER_WORKER_SOCKET):
+        if os.lstat(WHISPER_WORKER_SOCKET).st_uid != os.getuid():
+            raise SystemExit(f"{WHISPER_WORKER_SOCKET} belongs to another user; set WHISPER_WORKER_SOCKET elsewhere")
+        os.remove(WHISPER_WORKER_SOCKET)
+
+    server = WhisperWorker(WHISPER_WORKER_SOCKET)
+    logging.getLogger(__name__).info(f"Whisper worker listening on {WHISPER_WORKER_SOCKET}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(WHISPER_WORKER_SOCKET)
+
+if __name__ == "__main__":
+    main()